@@ -0,0 +1,62 @@
+import os
+from datetime import datetime
+
+from storage import CHUNK_SIZE
+
+
+# Packs archived attachments into a few large append-only files instead of one loose file per
+# upload. A packed blob is addressed by (pack name, offset, size); packs are rolled over at
+# `max_size`. Packs are only appended to by one archiving run at a time and never rewritten.
+class PackWriter:
+    def __init__(self, folder, max_size=1024 * 1024 * 1024, chunk_size=CHUNK_SIZE):
+        self.folder = folder
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self._file = None
+        self._name = None
+        self._count = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def _open(self):
+        self._count += 1
+        self._name = f"pack-{datetime.now():%Y%m%d-%H%M%S}-{self._count:03d}.pack"
+        self._file = open(os.path.join(self.folder, self._name), 'ab')
+
+    # Append the file at `source_path`; returns (pack name, offset, size)
+    def add(self, source_path):
+        if self._file is None or self._file.tell() >= self.max_size:
+            self.close()
+            self._open()
+        offset = self._file.tell()
+        with open(source_path, 'rb') as source:
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                self._file.write(chunk)
+        return self._name, offset, self._file.tell() - offset
+
+    # Flush the current pack to disk; call before committing rows that point into it
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+# Chunks of a packed blob, for streaming it in a response
+def read_packed(folder, pack, offset, size, chunk_size=CHUNK_SIZE):
+    with open(os.path.join(folder, os.path.basename(pack)), 'rb') as source:
+        source.seek(offset)
+        remaining = size
+        while remaining > 0:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                raise IOError(f"{pack} is truncated at {offset + size - remaining}")
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,222 @@
+# ASGI entry point for slow clients, e.g.
+#   uvicorn asgi:application --workers 4
+# Request bodies are received by the event loop into a spooled temporary file, and the Flask
+# view only runs in the thread pool (ASGI_THREADS threads per process) once the whole upload
+# has arrived, so a scan trickling in over a mobile link holds a socket, not a worker thread.
+# Attachments are handed back by the view as X-Sendfile and streamed from the event loop too.
+# Other response bodies are read on a separate pool (ASGI_STREAM_THREADS), so long-lived streams
+# such as /events don't take threads from the views, and are closed when the client disconnects.
+import asyncio
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+# Views only name the file to send; AsgiAdapter streams it (see send_attachment)
+os.environ.setdefault('ATTACHMENT_OFFLOAD', 'x-sendfile')
+# Event streams run on the stream pool instead of the view threads, so they may take most of it;
+# the rest is left for exports and other streamed responses
+os.environ.setdefault('SSE_MAX_STREAMS', str(int(os.environ.get('ASGI_STREAM_THREADS', 64)) * 3 // 4))
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/')
+
+
+# Runs a WSGI app under an ASGI server: bodies are buffered before the view runs, views run in a
+# bounded thread pool, response bodies are read in a second pool and X-Sendfile responses are
+# streamed by the event loop.
+class AsgiAdapter:
+    def __init__(self, wsgi_app, max_body_size=None, threads=32, stream_threads=64,
+                 spool_size=1024 * 1024, chunk_size=64 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size  # Bodies larger than this are buffered on disk
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+        self.streams = ThreadPoolExecutor(max_workers=stream_threads, thread_name_prefix='wsgi-stream')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"unsupported scope type {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                self.streams.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        headers = dict(scope['headers'])
+        declared = headers.get(b'content-length')
+        if self.max_body_size and declared and declared.isdigit() and int(declared) > self.max_body_size:
+            return await self.reject(send, 413, b'Request Entity Too Large')
+
+        with SpooledTemporaryFile(max_size=self.spool_size) as body:
+            received = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                received += len(chunk)
+                if self.max_body_size and received > self.max_body_size:
+                    return await self.reject(send, 413, b'Request Entity Too Large')
+                body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+            response, result = await loop.run_in_executor(self.executor, self.run_wsgi, scope, body, send, loop)
+
+        if result is None:
+            await self.send_file(scope['method'], *response, send, loop)
+        else:
+            await self.send_body(response, result, receive, send, loop)
+
+    async def reject(self, send, status, text):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(text)).encode())]})
+        await send({'type': 'http.response.body', 'body': text})
+
+    # Runs the view in the thread pool. Returns ((status, headers, path), None) for X-Sendfile
+    # responses and (response, iterable) for the rest; both are sent by the event loop.
+    def run_wsgi(self, scope, body, send, loop):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+            return lambda data: self.post(response, {'type': 'http.response.body', 'body': data, 'more_body': True},
+                                          send, loop)
+
+        result = self.wsgi_app(self.environ(scope, body), start_response)
+        headers = dict(response.get('headers', ()))
+        if b'x-sendfile' not in headers:
+            return response, result
+        if hasattr(result, 'close'):
+            result.close()
+        return (response['status'], [(name, value) for name, value in response['headers'] if name != b'x-sendfile'],
+                headers[b'x-sendfile'].decode('latin1')), None
+
+    # Sends a WSGI response body from the stream pool, all of it on one thread as the iterable may
+    # hold context variables. The event loop watches for the client disconnecting meanwhile; the
+    # body is then closed after the chunk being read instead of being read to the end.
+    async def send_body(self, response, result, receive, send, loop):
+        disconnected = threading.Event()
+        watcher = asyncio.ensure_future(self.watch_disconnect(receive, disconnected))
+        try:
+            await loop.run_in_executor(self.streams, self.iterate_body, response, result, disconnected, send, loop)
+        finally:
+            watcher.cancel()
+
+    def iterate_body(self, response, result, disconnected, send, loop):
+        try:
+            for chunk in result:
+                if disconnected.is_set():
+                    return
+                if chunk:
+                    self.post(response, {'type': 'http.response.body', 'body': chunk, 'more_body': True}, send, loop)
+            self.post(response, {'type': 'http.response.body', 'body': b''}, send, loop)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    # The request body has been read, so the next message is the disconnect
+    @staticmethod
+    async def watch_disconnect(receive, disconnected):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    # Sends a response message from a pool thread, starting the response first if need be
+    @staticmethod
+    def post(response, message, send, loop):
+        if not response.get('started'):
+            response['started'] = True
+            asyncio.run_coroutine_threadsafe(send({
+                'type': 'http.response.start', 'status': response['status'], 'headers': response['headers'],
+            }), loop).result()
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    async def send_file(self, method, status, headers, path, send, loop):
+        offset, length = 0, None
+        match = CONTENT_RANGE.match(dict(headers).get(b'content-range', b'').decode('latin1'))
+        if status == 206 and match:
+            offset, length = int(match.group(1)), int(match.group(2)) - int(match.group(1)) + 1
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+
+        if method != 'HEAD' and status not in (204, 304):
+            with open(path, 'rb') as source:
+                source.seek(offset)
+                remaining = length if length is not None else os.fstat(source.fileno()).st_size - offset
+                while remaining > 0:
+                    chunk = await loop.run_in_executor(None, source.read, min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    def environ(scope, body):
+        script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+        path_info = scope['path'].encode('utf8').decode('latin1')
+        if script_name and path_info.startswith(script_name):
+            path_info = path_info[len(script_name):]
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name,
+            'PATH_INFO': path_info,
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for name, value in scope['headers']:
+            name = name.decode('latin1').upper().replace('-', '_')
+            if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+                name = 'HTTP_' + name
+            value = value.decode('latin1')
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+
+_application = None
+
+
+def create_asgi_app():
+    global _application
+    if _application is None:
+        from wsgi import create_app
+        app = create_app()
+        _application = AsgiAdapter(app, max_body_size=app.config['MAX_CONTENT_LENGTH'],
+                                   threads=int(os.environ.get('ASGI_THREADS', 32)),
+                                   stream_threads=int(os.environ.get('ASGI_STREAM_THREADS', 64)),
+                                   chunk_size=app.config['UPLOAD_CHUNK_SIZE'])
+    return _application
+
+
+application = create_asgi_app()
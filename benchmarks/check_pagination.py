@@ -0,0 +1,89 @@
+# Pagination check: walks every page of the department question listing and of the questions
+# API by their cursors and fails (exit status 1) if a question shows up twice or not at all.
+# Questions sharing a created_at are added first, the normal way and with one explicit
+# timestamp, as ties on created_at are where keyset pagination goes wrong.
+#
+#   python benchmarks/generate_data.py --database-url sqlite:////tmp/bench.db --questions 10000
+#   python benchmarks/check_pagination.py --database-url sqlite:////tmp/bench.db
+#
+# Point it at a scratch database: questions are added.
+import argparse
+import re
+import sys
+from datetime import datetime
+
+from common import load_app
+from run_suite import Context
+
+QUESTION_ID = re.compile(r'id="replies-(\d{10})"')
+NEXT_CURSOR = re.compile(r'[?&]cursor=([^&"]+)')
+
+
+def add_tied_questions(app, department_id, count):
+    with app.app.app_context():
+        for number in range(count):
+            app.db.session.add(app.Question(id=app.allocate_question_ids()[0], department_id=department_id,
+                                            question=f"Pagination check {number}"))
+        app.db.session.commit()
+        tied_at = datetime.now().replace(microsecond=0)
+        for number in range(count):
+            app.db.session.add(app.Question(id=app.allocate_question_ids()[0], department_id=department_id,
+                                            question=f"Pagination check {number}", created_at=tied_at))
+        app.db.session.commit()
+
+
+def walk(fetch, expected_pages):
+    seen, cursor, pages = [], None, 0
+    while pages <= expected_pages + 1:  # A cursor that doesn't advance would loop forever
+        ids, cursor = fetch(cursor)
+        seen.extend(ids)
+        pages += 1
+        if not cursor:
+            break
+    return seen
+
+
+def check(name, seen, expected):
+    duplicates = len(seen) - len(set(seen))
+    missing = len(expected - set(seen))
+    extra = len(set(seen) - expected)
+    print(f"{name}: {len(set(seen))} of {len(expected)} questions, {duplicates} duplicates, "
+          f"{missing} missing, {extra} unexpected")
+    return not (duplicates or missing or extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--password', default='bench-password', help='the --password given to generate_data.py')
+    parser.add_argument('--tied', type=int, default=5, help='questions added per tie')
+    parser.add_argument('--per-page', type=int, default=7)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+    app.app.config['QUESTIONS_PER_PAGE'] = args.per_page
+    context = Context(app, args.password)
+    add_tied_questions(app, context.department_id, args.tied)
+    with app.app.app_context():
+        expected = {question_id for (question_id,) in app.db.session.query(app.Question.id)
+                    .filter_by(department_id=context.department_id)}
+    expected_pages = len(expected) // args.per_page + 1
+
+    def api_page(cursor):
+        url = f'/api/v1/questions?fields[questions]=id&limit={args.per_page}'
+        body = context.user.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        return [question['id'] for question in body['data']], body['next_cursor']
+
+    def listing_page(cursor):
+        html = context.user.get('/view_questions_by_user' + (f'?cursor={cursor}' if cursor else '')).data.decode()
+        match = NEXT_CURSOR.search(html)
+        return QUESTION_ID.findall(html), match.group(1) if match else None
+
+    results = [check('/api/v1/questions', walk(api_page, expected_pages), expected),
+               check('/view_questions_by_user', walk(listing_page, expected_pages), expected)]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
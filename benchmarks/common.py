@@ -0,0 +1,36 @@
+# Shared helpers for the benchmark scripts. The app reads DATABASE_URL (and the DB_POOL_*
+# settings) at import time, so the environment is prepared before `import app`.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_app(database_url, **env):
+    os.environ['DATABASE_URL'] = database_url
+    # A SQLite benchmark database gets its own archive database next to it
+    if database_url.startswith('sqlite:///'):
+        env.setdefault('ARCHIVE_DATABASE_URL', database_url + '-archive')
+    for name, value in env.items():
+        if value is not None:
+            os.environ[name] = str(value)
+    import app
+    return app
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# Department user the load scripts log in as
+def ensure_user(app, username, password, department_id, is_admin=False):
+    user = app.User.query.filter_by(username=username).first()
+    if user is None:
+        user = app.User(username=username, department_id=department_id, is_admin=is_admin)
+        user.set_password(password)
+        app.db.session.add(user)
+        app.db.session.commit()
+    return user
@@ -0,0 +1,90 @@
+# Benchmark for the listing fragment cache: seeds a department with questions, replies and
+# attachment rows, then times the admin and department listings with FRAGMENT_CACHE off and
+# with a warm cache, and once more right after a reply invalidates one block.
+#
+#   python benchmarks/fragment_cache_bench.py --database-url sqlite:////tmp/fragments.db --requests 50
+#
+# Point it at a scratch database: the tables are created if missing and rows are added.
+import argparse
+import time
+
+from common import load_app, percentile, ensure_user
+
+
+def seed(app, department_id, questions, replies_per_question):
+    prefix = time.strftime('%m%d%y')
+    existing = app.Question.query.filter_by(department_id=department_id).count()
+    for i in range(existing, questions):
+        question = app.Question(id=app.allocate_question_ids()[0], question=f"Grievance {i}: street light not working",
+                                department_id=department_id)
+        app.db.session.add(question)
+        app.db.session.flush()
+        for j in range(replies_per_question):
+            reply = app.Reply(reply=f"Reply {j} to grievance {i}", question_id=question.id, user_id=1)
+            app.db.session.add(reply)
+            app.db.session.flush()
+            app.db.session.add(app.File(file_name=f"reply_{j}.pdf", file_path=f"blobs/{prefix}/{i}-{j}",
+                                        question_id=question.id, reply_id=reply.id, department_id=department_id))
+    app.db.session.commit()
+
+
+def time_requests(client, url, count):
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<34} p50 {percentile(timings, 0.5):7.2f} ms   p95 {percentile(timings, 0.95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--questions', type=int, default=50, help='Questions in the benchmark department (one page).')
+    parser.add_argument('--replies', type=int, default=3, help='Replies per question, each with one attachment.')
+    parser.add_argument('--requests', type=int, default=30)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+    flask_app = app.app
+    with flask_app.app_context():
+        app.db.create_all()
+        app.create_default_users()
+        app.create_default_departments()
+        ensure_user(app, 'bench_fragments', 'bench', department_id=1)
+        seed(app, 1, args.questions, args.replies)
+        newest_id = app.db.session.query(app.Question.id).filter_by(department_id=1) \
+            .order_by(app.Question.created_at.desc(), app.Question.id.desc()).limit(1).scalar()
+
+    admin = flask_app.test_client()
+    admin.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    user = flask_app.test_client()
+    user.post('/login', data={'username': 'bench_fragments', 'password': 'bench'})
+
+    for label, client, url in [('admin /questions', admin, '/questions?department_id=1'),
+                               ('department listing', user, '/view_questions_by_user')]:
+        flask_app.config['FRAGMENT_CACHE'] = False
+        report(f"{label}, no cache", time_requests(client, url, args.requests))
+
+        flask_app.config['FRAGMENT_CACHE'] = True
+        app.fragment_cache.clear()
+        time_requests(client, url, 1)
+        report(f"{label}, warm cache", time_requests(client, url, args.requests))
+
+        # One block changes per reply; the rest of the page stays cached
+        after_reply = []
+        for _ in range(min(args.requests, 10)):
+            user.post('/view_questions_by_user', data={'reply': 'benchmark reply', 'question_id': newest_id})
+            after_reply += time_requests(client, url, 1)
+        report(f"{label}, after a reply", after_reply)
+
+    print(app.fragment_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Benchmark for the bulk question import: writes a CSV of synthetic grievances spread over the
+# existing departments, imports it and reports rows per second.
+#
+#   python benchmarks/import_bench.py --database-url sqlite:////tmp/import.db --rows 9000
+#
+# Point it at a scratch database: the tables are created if missing and rows are added.
+# Question IDs allow 9999 questions a day, so use a fresh database for each run.
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from common import load_app
+
+
+def write_csv(path, rows, departments):
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(['question', 'department'])
+        for i in range(rows):
+            writer.writerow([f"Grievance {i}: road repair pending in ward {random.randint(1, 60)}",
+                             random.choice(departments)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--rows', type=int, default=9000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, SLOW_QUERY_THRESHOLD_MS=60000)
+    with app.app.app_context():
+        app.db.create_all()
+        app.create_default_departments()
+        departments = [name for (name,) in app.db.session.query(app.Department.name)]
+
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            write_csv(path, args.rows, departments)
+            started = time.perf_counter()
+            with open(path, 'rb') as stream:
+                rows = app.open_import(stream, path)
+                imported, errors = app.import_questions(rows, args.chunk_size)
+            elapsed = time.perf_counter() - started
+        finally:
+            os.remove(path)
+
+    print(f"{imported} rows imported in {elapsed:.2f}s: {imported / elapsed:.0f} rows/s "
+          f"(chunk size {args.chunk_size}, {len(errors)} rejected)")
+
+
+if __name__ == '__main__':
+    main()
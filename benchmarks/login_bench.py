@@ -0,0 +1,90 @@
+# Benchmark for password hashing cost: a morning login spike of many threads logging in at once,
+# with a page viewer running alongside to show whether other requests stall. Reports logins per
+# second and latencies at the given scrypt parameters.
+#
+#   python benchmarks/login_bench.py --database-url sqlite:////tmp/login.db --n 16384 --r 8 --hash-threads 4
+#
+# Point it at a scratch database: the tables are created if missing and a test user is added.
+import argparse
+import threading
+import time
+
+from common import ensure_user, load_app, percentile
+
+
+def login_worker(app, count, latencies, errors):
+    for _ in range(count):
+        client = app.app.test_client()
+        started = time.perf_counter()
+        response = client.post('/login', data={'username': 'bench_login', 'password': 'bench-password'})
+        latencies.append(time.perf_counter() - started)
+        if response.location != '/department/dashboard':
+            errors.append(response.location)
+
+
+def page_worker(app, stop, latencies):
+    client = app.app.test_client()
+    client.post('/login', data={'username': 'bench_login', 'password': 'bench-password'})
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/user/department_summary')
+        latencies.append(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--n', type=int, default=2 ** 14, help='scrypt CPU/memory cost')
+    parser.add_argument('--r', type=int, default=8, help='scrypt block size')
+    parser.add_argument('--p', type=int, default=1, help='scrypt parallelism')
+    parser.add_argument('--hash-threads', type=int, default=4, help='PASSWORD_HASH_THREADS')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent logins')
+    parser.add_argument('--logins', type=int, default=200, help='total logins across all threads')
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, PASSWORD_SCRYPT_N=args.n, PASSWORD_SCRYPT_R=args.r, PASSWORD_SCRYPT_P=args.p,
+                   PASSWORD_HASH_THREADS=args.hash_threads, SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+    with app.app.app_context():
+        app.db.create_all()
+        app.create_default_users()
+        app.create_default_departments()
+        user = ensure_user(app, 'bench_login', 'bench-password', department_id=1)
+        user.set_password('bench-password')  # At the parameters under test
+        app.db.session.commit()
+
+    started = time.perf_counter()
+    for _ in range(20):
+        app.password_hasher.hash('bench-password')
+    single = (time.perf_counter() - started) / 20
+
+    latencies, errors, page_latencies, stop = [], [], [], threading.Event()
+    viewer = threading.Thread(target=page_worker, args=(app, stop, page_latencies))
+    viewer.start()
+    time.sleep(0.5)
+    baseline = len(page_latencies)
+
+    per_thread = args.logins // args.threads
+    threads = [threading.Thread(target=login_worker, args=(app, per_thread, latencies, errors))
+               for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    viewer.join()
+
+    during = page_latencies[baseline:]
+    print(f"scrypt n={args.n} r={args.r} p={args.p}: {single * 1000:.1f} ms per hash, "
+          f"{args.n * args.r * 128 // 1024} KiB each")
+    print(f"{len(latencies)} logins in {elapsed:.2f}s with {args.threads} threads and {args.hash_threads} hashing threads: "
+          f"{len(latencies) / elapsed:.1f} logins/s, p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, {len(errors)} failed")
+    print(f"page views during the spike: p50 {percentile(during, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(during, 0.95) * 1000:.1f} ms (before: p50 "
+          f"{percentile(page_latencies[:baseline], 0.5) * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
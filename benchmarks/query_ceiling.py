@@ -0,0 +1,61 @@
+# Query-count ceiling for the question listings: each route is requested with a small and a
+# large page size against a database filled by generate_data.py, with the fragment cache off so
+# every question on the page is loaded. The SQL statement count (from the Server-Timing header)
+# must be the same for both and stay under the route's ceiling, however many questions, replies
+# and files the page shows; the exit status is 1 otherwise.
+#
+#   python benchmarks/generate_data.py --database-url sqlite:////tmp/bench.db --questions 10000
+#   python benchmarks/query_ceiling.py --database-url sqlite:////tmp/bench.db
+import argparse
+import sys
+
+from common import load_app
+from run_suite import Context, query_count
+
+# (route, client, most statements one request may run)
+ROUTES = [
+    ('/view_questions_by_user', 'user', 7),
+    ('/questions', 'admin', 7),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--password', default='bench-password', help='the --password given to generate_data.py')
+    parser.add_argument('--small-page', type=int, default=5)
+    # Selectin loading batches its IN lists 500 keys at a time, so one page stays in one batch
+    parser.add_argument('--large-page', type=int, default=500)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+    app.app.config['FRAGMENT_CACHE'] = False
+    context = Context(app, args.password)
+
+    failures = []
+    for route, client, ceiling in ROUTES:
+        counts, sizes, statuses = [], [], []
+        for per_page in (args.small_page, args.large_page):
+            app.app.config['QUESTIONS_PER_PAGE'] = per_page
+            response = getattr(context, client).get(route)
+            counts.append(query_count(response))
+            sizes.append(len(response.data))
+            statuses.append(response.status_code)
+            response.close()
+        print(f"{route}: {counts[0]} queries for {args.small_page} questions ({sizes[0]} bytes), "
+              f"{counts[1]} for up to {args.large_page} ({sizes[1]} bytes), ceiling {ceiling}")
+        if max(statuses) >= 400:
+            failures.append(f"{route}: status {statuses}")
+        elif None in counts:
+            failures.append(f"{route}: no query count in the Server-Timing header")
+        elif counts[1] != counts[0] or counts[1] > ceiling:
+            failures.append(f"{route}: {counts[0]} -> {counts[1]} queries, ceiling {ceiling}")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
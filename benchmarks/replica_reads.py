@@ -0,0 +1,110 @@
+# Benchmark for read/write splitting with SQLite files standing in for the MySQL primary and a
+# replica: reply writers run against the primary while officers load the dashboards and
+# listings, and a replication thread copies the primary into the replica every few seconds
+# (SQLite's online backup, so the lag is real). Run it with and without --replica-url to
+# compare reader latency and see the lag fallback in the replica stats.
+#
+#   python benchmarks/generate_data.py --database-url sqlite:////tmp/bench.db
+#   python benchmarks/replica_reads.py --database-url sqlite:////tmp/bench.db --replica-url sqlite:////tmp/bench-replica.db
+#   python benchmarks/replica_reads.py --database-url sqlite:////tmp/bench.db
+import argparse
+import random
+import sqlite3
+import threading
+import time
+
+from common import load_app, percentile
+
+READ_URLS = ['/admin/dashboard', '/questions', '/admin/sla']
+
+
+def sqlite_path(url):
+    return url[len('sqlite:///'):]
+
+
+def copy_database(primary, replica):
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def replicate(primary, replica, every, stop):
+    while not stop.wait(every):
+        copy_database(primary, replica)
+
+
+def writer(app, username, question_ids, stop, latencies):
+    client = app.app.test_client()
+    client.post('/login', data={'username': username, 'password': 'bench-password'})
+    rng = random.Random(username)
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.post('/view_questions_by_user', data={'reply': 'Benchmark reply', 'question_id': rng.choice(question_ids)})
+        latencies.append(time.perf_counter() - started)
+
+
+def reader(app, stop, latencies):
+    client = app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    rng = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get(rng.choice(READ_URLS))
+        latencies.append(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True, help='sqlite:////path of a database from generate_data.py')
+    parser.add_argument('--replica-url', help='sqlite:////path for the replica copy; omit to read from the primary')
+    parser.add_argument('--replicate-every', type=float, default=2.0, help='seconds between replica refreshes')
+    parser.add_argument('--max-lag', type=float, default=5.0, help='REPLICA_MAX_LAG_SECONDS')
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=15)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    threads = []
+    if args.replica_url:
+        primary, replica = sqlite_path(args.database_url), sqlite_path(args.replica_url)
+        copy_database(primary, replica)
+        threads.append(threading.Thread(target=replicate, args=(primary, replica, args.replicate_every, stop)))
+    app = load_app(args.database_url, DATABASE_REPLICA_URLS=args.replica_url, REPLICA_MAX_LAG_SECONDS=args.max_lag,
+                   REPLICA_LAG_CHECK_SECONDS=1, REPLICA_CONSISTENCY_SECONDS=5,
+                   SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+
+    with app.app.app_context():
+        departments = app.db.session.query(app.User.username, app.User.department_id) \
+            .filter(app.User.department_id.isnot(None)).limit(args.writers).all()
+        question_ids = {department_id: [question_id for (question_id,) in app.db.session.query(app.Question.id)
+                                        .filter_by(department_id=department_id).limit(500)]
+                        for _, department_id in departments}
+
+    write_latencies, read_latencies = [], []
+    for username, department_id in departments:
+        threads.append(threading.Thread(target=writer, args=(app, username, question_ids[department_id], stop, write_latencies)))
+    for _ in range(args.readers):
+        threads.append(threading.Thread(target=reader, args=(app, stop, read_latencies)))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    mode = f"replica refreshed every {args.replicate_every}s" if args.replica_url else "primary only"
+    print(f"{mode}, {len(departments)} writers, {args.readers} readers, {args.seconds:.0f}s")
+    print(f"reads:  {len(read_latencies)} ({len(read_latencies) / args.seconds:.1f}/s), "
+          f"p50 {percentile(read_latencies, 0.5) * 1000:.1f} ms, p95 {percentile(read_latencies, 0.95) * 1000:.1f} ms")
+    print(f"writes: {len(write_latencies)} ({len(write_latencies) / args.seconds:.1f}/s), "
+          f"p50 {percentile(write_latencies, 0.5) * 1000:.1f} ms, p95 {percentile(write_latencies, 0.95) * 1000:.1f} ms")
+    if args.replica_url:
+        print(f"replicas: {app.replica_router.stats()}")
+
+
+if __name__ == '__main__':
+    main()
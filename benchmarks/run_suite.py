@@ -0,0 +1,220 @@
+# Route benchmark suite: drives every main route through Flask's test client against a database
+# filled by generate_data.py and reports latency percentiles, SQL statements per request (from
+# the Server-Timing header) and peak Python memory per request (tracemalloc). Results can be
+# saved as a baseline and later runs compared against it; a regression makes the exit status 1.
+#
+#   python benchmarks/generate_data.py --database-url sqlite:////tmp/bench.db --questions 10000
+#   python benchmarks/run_suite.py --database-url sqlite:////tmp/bench.db --save-baseline benchmarks/baseline.json
+#   python benchmarks/run_suite.py --database-url sqlite:////tmp/bench.db --compare benchmarks/baseline.json
+#
+# Write scenarios add replies, uploads and questions, so run it against a scratch database and
+# regenerate it (same --seed) before a run that is compared with a baseline.
+# Timings depend on the machine: benchmarks/baseline.json was taken on SQLite with the
+# generate_data.py defaults; save a fresh baseline before comparing on other hardware or MySQL.
+import argparse
+import atexit
+import io
+import json
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import load_app, percentile
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+UPLOAD = b'%PDF-1.4\n' + bytes(random.Random(0).getrandbits(8) for _ in range(64 * 1024))
+
+
+class Context:
+    def __init__(self, app, password):
+        self.app = app
+        self.password = password
+        with app.app.app_context():
+            db = app.db
+            # The busiest department, so listings and dashboards see the most rows
+            self.department_id, = db.session.query(app.Question.department_id) \
+                .group_by(app.Question.department_id).order_by(db.func.count().desc()).first()
+            self.username = db.session.query(app.User.username) \
+                .filter_by(department_id=self.department_id).order_by(app.User.id).first()[0]
+            self.question_ids = [question_id for (question_id,) in db.session.query(app.Question.id)
+                                 .filter_by(department_id=self.department_id)
+                                 .order_by(app.Question.created_at.desc()).limit(200)]
+        self.random = random.Random(1)
+        self.api_etag = None
+        self.admin = self.login('admin', 'admin123')
+        self.user = self.login(self.username, password)
+
+    def login(self, username, password):
+        client = self.app.app.test_client()
+        response = client.post('/login', data={'username': username, 'password': password})
+        if response.status_code != 302 or response.location.endswith('/login'):
+            raise SystemExit(f"can't log in as {username}; was the database made by generate_data.py?")
+        return client
+
+    def question_id(self):
+        return self.random.choice(self.question_ids)
+
+
+def login(context):
+    client = context.app.app.test_client()
+    return client.post('/login', data={'username': context.username, 'password': context.password})
+
+
+API_QUESTIONS = '/api/v1/questions?fields[questions]=id,question,created_at,replies'
+
+
+# Refresh of an unchanged API page: a 304 from the department's version stamp
+def api_not_modified(context):
+    if context.api_etag is None:
+        context.api_etag = context.user.get(API_QUESTIONS).headers['ETag']
+    return context.user.get(API_QUESTIONS, headers={'If-None-Match': context.api_etag})
+
+
+# (name, function making one request and returning the response)
+SCENARIOS = [
+    ('login', login),
+    ('admin_dashboard', lambda c: c.admin.get('/admin/dashboard')),
+    ('admin_questions', lambda c: c.admin.get('/questions')),
+    ('admin_questions_department', lambda c: c.admin.get(f'/questions?department_id={c.department_id}')),
+    ('admin_questions_pending', lambda c: c.admin.get('/questions?status=pending')),
+    ('sla_report', lambda c: c.admin.get('/admin/sla')),
+    ('department_dashboard', lambda c: c.user.get('/department/dashboard')),
+    ('department_questions', lambda c: c.user.get('/view_questions_by_user')),
+    ('department_summary', lambda c: c.user.get('/user/department_summary')),
+    ('question_detail', lambda c: c.user.get(f'/user/question/{c.question_id()}')),
+    ('search', lambda c: c.user.get('/search?q=water')),
+    ('api_questions', lambda c: c.user.get(API_QUESTIONS)),
+    ('api_questions_not_modified', api_not_modified),
+    ('reply_post', lambda c: c.user.post('/view_questions_by_user', data={
+        'reply': 'Benchmark reply', 'question_id': c.question_id()})),
+    ('reply_upload', lambda c: c.user.post(f'/add_reply/{c.question_id()}', data={
+        'reply': 'Benchmark reply with a scan', 'file': (io.BytesIO(UPLOAD), 'scan.pdf')},
+        content_type='multipart/form-data')),
+    ('add_question', lambda c: c.admin.post('/admin/add_question', data={
+        'question': 'Benchmark question: street light not working', 'department': str(c.department_id),
+        'files': (io.BytesIO(UPLOAD), 'photo.pdf')}, content_type='multipart/form-data')),
+]
+
+
+def query_count(response):
+    for value in response.headers.getlist('Server-Timing'):
+        match = SERVER_TIMING_QUERIES.search(value)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def run_scenario(context, request, warmup, iterations):
+    for _ in range(warmup):
+        request(context)
+
+    latencies, queries, errors = [], [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = request(context)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.close()
+        if response.status_code >= 400:
+            errors += 1
+        count = query_count(response)
+        if count is not None:
+            queries.append(count)
+
+    # Measured separately: tracemalloc slows every allocation down
+    tracemalloc.start()
+    request(context).close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'queries': max(queries) if queries else None,
+        'peak_kib': round(peak / 1024, 1),
+        'errors': errors,
+    }
+
+
+# Regressions of `current` against `baseline`: a slower median or more memory by more than
+# `tolerance` (a fraction) plus some slack, any extra SQL statements, or new errors
+def compare(current, baseline, tolerance):
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        # Tail latencies swing too much between runs to gate on, and a few milliseconds either
+        # way are noise on fast routes, so each limit also has some absolute slack
+        for metric, slack in (('p50_ms', 2), ('peak_kib', 64)):
+            if result[metric] > before[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {result[metric]}")
+        if result['queries'] is not None and before['queries'] is not None and result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+        if result['errors'] > before['errors']:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--password', default='bench-password', help='the --password given to generate_data.py')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', action='append', help='run only these scenarios (repeatable)')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='store the results as the new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a stored baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before it counts as a regression')
+    args = parser.parse_args()
+
+    app = load_app(args.database_url, SLOW_QUERY_THRESHOLD_MS=60000, JOB_WORKERS=0)
+    app.app.config['UPLOAD_FOLDER'] = upload_folder = tempfile.mkdtemp(prefix='suite-uploads-')
+    context = Context(app, args.password)
+    with app.app.app_context():
+        scale = {'questions': app.Question.query.count(), 'replies': app.Reply.query.count(),
+                 'files': app.File.query.count(), 'departments': app.Department.query.count()}
+        database = app.db.engine.dialect.name
+
+    results = {}
+    atexit.register(shutil.rmtree, upload_folder, True)
+    print(f"{'scenario':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>9} {'errors':>7}")
+    for name, request in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        result = results[name] = run_scenario(context, request, args.warmup, args.iterations)
+        queries = '-' if result['queries'] is None else result['queries']
+        print(f"{name:<28} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} {queries:>8} "
+              f"{result['peak_kib']:>9} {result['errors']:>7}", flush=True)
+
+    report = {'scale': scale, 'python': platform.python_version(),
+              'database': database, 'iterations': args.iterations, 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+                output.write('\n')
+
+    if args.compare:
+        with open(args.compare) as source:
+            baseline = json.load(source)
+        # The write scenarios add a few rows per run, so only a different data set is worth a warning
+        if baseline['database'] != database or abs(baseline['scale']['questions'] - scale['questions']) > scale['questions'] * 0.1:
+            print(f"warning: the baseline was taken on {baseline['database']} with {baseline['scale']}, "
+                  f"this run is {database} with {scale}")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
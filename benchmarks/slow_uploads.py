@@ -0,0 +1,147 @@
+# Load test for slow clients: a few uploaders send reply attachments at mobile-link speeds while
+# viewers keep loading pages, then page view latency is reported for both phases (viewers alone,
+# viewers next to the uploads). Run it against a server started from wsgi.py or asgi.py:
+#
+#   uvicorn asgi:application --port 8000 &
+#   python benchmarks/slow_uploads.py --base-url http://127.0.0.1:8000 --username loadtest \
+#       --password loadtest --question-id 1018260001 --uploaders 8 --rate 32768 --size 1048576
+#
+# The account must be a department user that can reply to the question.
+import argparse
+import http.client
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from common import percentile
+
+PAGES = ['/department/dashboard', '/view_questions_by_user', '/user/department_summary']
+
+
+def connect(base_url):
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return connection_class(parts.hostname, parts.port, timeout=600)
+
+
+def login(base_url, username, password):
+    connection = connect(base_url)
+    connection.request('POST', '/login', urlencode({'username': username, 'password': password}),
+                       {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    cookies = [header.split(';', 1)[0] for name, header in response.getheaders() if name.lower() == 'set-cookie']
+    if response.status != 302 or not cookies:
+        raise SystemExit(f"login failed with status {response.status}")
+    return '; '.join(cookies)
+
+
+def view_pages(base_url, cookie, stop, latencies, errors):
+    connection = connect(base_url)
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            connection.request('GET', PAGES[i % len(PAGES)], headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as error:
+            errors.append(type(error).__name__)
+            connection = connect(base_url)
+        latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+# Posts a reply with a `size` byte attachment, sending at most `rate` bytes per second
+def slow_upload(base_url, cookie, question_id, size, rate, durations, errors):
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"reply\"\r\n\r\nslow upload test\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"scan.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    started = time.perf_counter()
+    connection = connect(base_url)
+    try:
+        connection.putrequest('POST', f'/add_reply/{question_id}')
+        connection.putheader('Cookie', cookie)
+        connection.putheader('Content-Type', f'multipart/form-data; boundary={boundary}')
+        connection.putheader('Content-Length', str(len(head) + size + len(tail)))
+        connection.endheaders()
+        connection.send(head)
+        chunk = max(rate // 10, 1)
+        sent = 0
+        while sent < size:
+            block = min(chunk, size - sent)
+            connection.send(b'\xff' * block)
+            sent += block
+            time.sleep(block / rate)
+        connection.send(tail)
+        response = connection.getresponse()
+        response.read()
+        if response.status not in (200, 302):
+            errors.append(response.status)
+    except (OSError, http.client.HTTPException) as error:
+        errors.append(type(error).__name__)
+    durations.append(time.perf_counter() - started)
+
+
+def run_viewers(args, cookie):
+    latencies, errors, stop = [], [], threading.Event()
+    threads = [threading.Thread(target=view_pages, args=(args.base_url, cookie, stop, latencies, errors))
+               for _ in range(args.viewers)]
+    for thread in threads:
+        thread.start()
+    return latencies, errors, stop, threads
+
+
+def report(label, latencies, errors):
+    print(f"{label}: {len(latencies)} page views, {len(errors)} errors, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"max {max(latencies, default=0) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', required=True)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--question-id', required=True)
+    parser.add_argument('--uploaders', type=int, default=8)
+    parser.add_argument('--size', type=int, default=512 * 1024, help='attachment size in bytes')
+    parser.add_argument('--rate', type=int, default=32 * 1024, help='upload speed per client in bytes/s')
+    parser.add_argument('--viewers', type=int, default=4)
+    parser.add_argument('--baseline-seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    cookie = login(args.base_url, args.username, args.password)
+
+    latencies, errors, stop, threads = run_viewers(args, cookie)
+    time.sleep(args.baseline_seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    report("viewers alone", latencies, errors)
+
+    latencies, errors, stop, threads = run_viewers(args, cookie)
+    durations, upload_errors = [], []
+    uploaders = [threading.Thread(target=slow_upload, args=(args.base_url, cookie, args.question_id, args.size,
+                                                            args.rate, durations, upload_errors))
+                 for _ in range(args.uploaders)]
+    for thread in uploaders:
+        thread.start()
+    for thread in uploaders:
+        thread.join()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    report(f"viewers with {args.uploaders} slow uploads", latencies, errors)
+    print(f"uploads: {len(durations)} done, {len(upload_errors)} errors, "
+          f"slowest {max(durations, default=0):.1f}s at {args.rate} B/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+# In-process LRU cache with a per-entry TTL and hit/miss counters.
+# An optional shared backend (see DictBackend / RedisBackend) is consulted on a local miss and
+# written through on set/delete, so several workers can share one copy of each entry.
+# A delete only reaches the other workers' local copies once they expire; for entries that change
+# (rather than versioned keys) pass local=False to keep them in the backend only.
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=300, backend=None, local=True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.local = local or backend is None
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key) if self.local else None
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        value = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.local:
+                self._store(key, value, now)
+        return value
+
+    def set(self, key, value):
+        if self.local:
+            with self._lock:
+                self._store(key, value, time.monotonic())
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+    # Caller holds the lock
+    def _store(self, key, value, now):
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+# Shared backends take JSON-serialisable values and expire entries themselves.
+
+# Local stand-in for a shared backend, e.g. for tests or a single-process deployment
+class DictBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return json.loads(entry[1])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, json.dumps(value))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Redis backend; needs the optional `redis` package
+class RedisBackend:
+    def __init__(self, url, prefix='jansunwai:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
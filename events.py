@@ -0,0 +1,147 @@
+import json
+import queue
+import threading
+import uuid
+from collections import deque
+
+
+class EventBrokerBusy(Exception):
+    pass
+
+
+# One published event; `sequence` increases per channel so reconnecting clients can resume
+class Event:
+    __slots__ = ('id', 'sequence', 'name', 'data')
+
+    def __init__(self, token, sequence, name, data):
+        self.id = f"{token}-{sequence}"
+        self.sequence = sequence
+        self.name = name
+        self.data = data
+
+    # Server-sent events wire format
+    def encode(self):
+        return f"id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True  # Slow reader; it is told to reload instead of getting a partial stream
+
+    # Next event, or None after `timeout` seconds without one
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+# In-process publish/subscribe fan-out for server-sent events. Every subscriber gets its own
+# bounded queue; the last `history` events of each channel are kept so a reconnecting client
+# can catch up from its Last-Event-ID. With a RedisTransport, events published by any worker
+# process are delivered to the subscribers of every process. Each open stream holds a server
+# thread, so at most `max_subscribers` subscriptions are open at once; past that, subscribe
+# raises EventBrokerBusy.
+class EventBroker:
+    def __init__(self, history=100, queue_size=100, transport=None, max_subscribers=None):
+        self.history = history
+        self.queue_size = queue_size
+        self.transport = transport
+        self.max_subscribers = max_subscribers
+        self._count = 0
+        self._subscribers = {}
+        self._recent = {}
+        self._sequence = {}
+        self._lock = threading.Lock()
+        self.token = uuid.uuid4().hex[:8]  # Event ids from another process or an earlier run don't match
+        if transport is not None:
+            transport.start(self._deliver)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and self._count >= self.max_subscribers:
+                raise EventBrokerBusy(f"{self._count} event streams are open")
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    # Safe to call more than once
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, name, data):
+        if self.transport is not None:
+            self.transport.publish(channel, name, data)
+        else:
+            self._deliver(channel, name, data)
+
+    def _deliver(self, channel, name, data):
+        with self._lock:
+            self._sequence[channel] = self._sequence.get(channel, 0) + 1
+            event = Event(self.token, self._sequence[channel], name, data)
+            self._recent.setdefault(channel, deque(maxlen=self.history)).append(event)
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    # Events after the one with id `last_id`, or None if they can't all be replayed
+    def replay(self, channel, last_id):
+        token, _, last_sequence = last_id.partition('-')
+        if token != self.token or not last_sequence.isdigit():
+            return None
+        last_sequence = int(last_sequence)
+        with self._lock:
+            recent = list(self._recent.get(channel, ()))
+            sequence = self._sequence.get(channel, 0)
+        missed = [event for event in recent if event.sequence > last_sequence]
+        if last_sequence > sequence or len(missed) < sequence - last_sequence:
+            return None
+        return missed
+
+    def stats(self):
+        with self._lock:
+            return {'channels': len(self._subscribers), 'subscribers': self._count,
+                    'max_subscribers': self.max_subscribers}
+
+
+# Relays events between worker processes over Redis pub/sub; needs the optional `redis` package.
+# Each process numbers the events it receives itself, so a client that reconnects to another
+# worker can't resume and is told to reload.
+class RedisTransport:
+    def __init__(self, url, prefix='jansunwai:events:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def start(self, deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+
+        def handle(message):
+            channel = message['channel'].decode()[len(self.prefix):]
+            event = json.loads(message['data'])
+            deliver(channel, event['name'], event['data'])
+
+        pubsub.psubscribe(**{self.prefix + '*': handle})
+        pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, channel, name, data):
+        self.client.publish(self.prefix + channel, json.dumps({'name': name, 'data': data}))
@@ -0,0 +1,90 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('jansunwai.sql')
+
+
+# Per-request SQL instrumentation on SQLAlchemy engine events.
+# Each request counts its statements and DB time; the totals go into a Server-Timing header and
+# into per-endpoint aggregates. Statements slower than SLOW_QUERY_THRESHOLD_MS are logged and kept
+# in a short history, sampled at SLOW_QUERY_SAMPLE_RATE.
+class QueryInstrumentation:
+    def __init__(self, app=None):
+        self.slow_queries = deque(maxlen=100)
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 100)
+        app.config.setdefault('SLOW_QUERY_SAMPLE_RATE', 1.0)
+        app.config.setdefault('SERVER_TIMING_HEADER', True)
+        self.app = app
+        # Registered on the Engine class so every bind is covered
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_time += elapsed
+
+        if elapsed * 1000 >= self.app.config['SLOW_QUERY_THRESHOLD_MS'] \
+                and random.random() < self.app.config['SLOW_QUERY_SAMPLE_RATE']:
+            endpoint = request.endpoint if has_request_context() else None
+            logger.warning("slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, statement)
+            self.slow_queries.append({
+                'at': time.time(),
+                'endpoint': endpoint,
+                'duration_ms': round(elapsed * 1000, 3),
+                'statement': statement,
+            })
+
+    def _start_request(self):
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        if 'sql_count' not in g:
+            return response
+        total = time.perf_counter() - g.request_started
+        if self.app.config['SERVER_TIMING_HEADER']:
+            response.headers.add('Server-Timing', f'db;dur={g.sql_time * 1000:.1f};desc="{g.sql_count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total * 1000:.1f}')
+
+        with self._lock:
+            totals = self.endpoints.setdefault(request.endpoint or 'unknown',
+                                               {'requests': 0, 'queries': 0, 'db_ms': 0.0, 'total_ms': 0.0})
+            totals['requests'] += 1
+            totals['queries'] += g.sql_count
+            totals['db_ms'] += g.sql_time * 1000
+            totals['total_ms'] += total * 1000
+        return response
+
+    def stats(self):
+        with self._lock:
+            endpoints = {
+                name: {
+                    'requests': totals['requests'],
+                    'queries_per_request': round(totals['queries'] / totals['requests'], 2),
+                    'db_ms_per_request': round(totals['db_ms'] / totals['requests'], 3),
+                    'total_ms_per_request': round(totals['total_ms'] / totals['requests'], 3),
+                }
+                for name, totals in self.endpoints.items()
+            }
+        return {'endpoints': endpoints, 'slow_queries': list(self.slow_queries)}
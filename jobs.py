@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger('jansunwai.jobs')
+
+
+# Background jobs kept in a database table, which doubles as the broker.
+# Handlers enqueue inside their own transaction, so a job exists exactly when the data it
+# refers to was committed. Worker threads (or `flask --app app worker` processes) claim due
+# jobs with a conditional UPDATE, run them in an app context and retry failures with
+# exponential backoff until max_attempts is reached. Done jobs are deleted after
+# JOB_RETENTION_DAYS by the workers (see purge); failed ones are kept for inspection.
+class JobQueue:
+    def __init__(self, app=None, db=None, model=None):
+        self.tasks = {}
+        self.threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        app.config.setdefault('JOB_WORKERS', 2)  # In-process worker threads, 0 to leave jobs to `flask worker`
+        app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOB_RETRY_BASE_SECONDS', 10)  # Delay after the first failure, doubled per attempt
+        app.config.setdefault('JOB_RETRY_MAX_SECONDS', 3600)
+        app.config.setdefault('JOB_POLL_SECONDS', 5)  # Idle workers look for due retries this often
+        app.config.setdefault('JOB_LOCK_TIMEOUT', 600)  # Running jobs older than this are claimed again
+        app.config.setdefault('JOB_RETENTION_DAYS', 7)  # Done jobs are deleted after this, 0 keeps them
+        app.config.setdefault('JOB_PURGE_INTERVAL', 3600)  # Seconds between purges in each process
+        self.app, self.db, self.model = app, db, model
+        # Wake idle workers as soon as a transaction that may have enqueued something commits
+        event.listen(Session, 'after_commit', self._after_commit)
+
+    # Register a handler: @jobs.task('name') def handler(**payload)
+    def task(self, name):
+        def register(func):
+            self.tasks[name] = func
+            return func
+        return register
+
+    # Add a job to the current session; it is picked up once the caller commits
+    def enqueue(self, kind, run_at=None, max_attempts=None, **payload):
+        if kind not in self.tasks:
+            raise KeyError(f"unknown job kind '{kind}'")
+        job = self.model(kind=kind, payload=json.dumps(payload), status='queued', attempts=0,
+                         max_attempts=max_attempts or self.app.config['JOB_MAX_ATTEMPTS'],
+                         run_at=run_at or datetime.now())
+        self.db.session.add(job)
+        if self.app.config['JOB_WORKERS'] and not self.threads:
+            self.start(self.app.config['JOB_WORKERS'])
+        return job
+
+    def _after_commit(self, session):
+        if self.threads:
+            self._wake.set()
+
+    def start(self, workers):
+        with self._lock:
+            if self.threads:
+                return
+            self._stop.clear()
+            for number in range(workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{number}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def _work(self):
+        while not self._stop.is_set():
+            self._purge_if_due()
+            if not self.run_next():
+                self._wake.wait(self.app.config['JOB_POLL_SECONDS'])
+                self._wake.clear()
+
+    # Claim and run one due job; returns False when there was nothing to do
+    def run_next(self):
+        with self.app.app_context():
+            job = self._claim()
+            if job is None:
+                return False
+            self._run(job)
+            return True
+
+    # Run due jobs until none are left (used by `flask worker --burst` and tests)
+    def run_pending(self):
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+    def _claim(self):
+        Job, session = self.model, self.db.session
+        now = datetime.now()
+        stale = now - timedelta(seconds=self.app.config['JOB_LOCK_TIMEOUT'])
+        claimable = self.db.or_(
+            self.db.and_(Job.status == 'queued', Job.run_at <= now),
+            self.db.and_(Job.status == 'running', Job.locked_at < stale),  # Its worker died
+        )
+        candidates = session.query(Job.id).filter(claimable).order_by(Job.run_at, Job.id).limit(5).all()
+        session.rollback()
+        for (job_id,) in candidates:
+            # Only one worker wins the conditional update, and a job that finished since the
+            # SELECT (done or failed, however old its lock) no longer matches
+            claimed = session.execute(
+                self.db.update(Job)
+                .where(Job.id == job_id, claimable)
+                .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+            ).rowcount
+            session.commit()
+            if claimed:
+                return session.get(Job, job_id)
+        return None
+
+    def _run(self, job):
+        session = self.db.session
+        started = time.perf_counter()
+        try:
+            self.tasks[job.kind](**json.loads(job.payload))
+            session.commit()
+        except Exception:
+            session.rollback()
+            job = session.get(self.model, job.id)
+            job.last_error = traceback.format_exc()[-4000:]
+            if job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.finished_at = datetime.now()
+                logger.error("job %s (%s) failed after %d attempts", job.id, job.kind, job.attempts)
+            else:
+                delay = min(self.app.config['JOB_RETRY_BASE_SECONDS'] * 2 ** (job.attempts - 1),
+                            self.app.config['JOB_RETRY_MAX_SECONDS'])
+                job.status = 'queued'
+                job.run_at = datetime.now() + timedelta(seconds=delay)
+                logger.warning("job %s (%s) failed, retrying in %ds", job.id, job.kind, delay)
+        else:
+            job.status = 'done'
+            job.finished_at = datetime.now()
+            logger.debug("job %s (%s) done in %.1f ms", job.id, job.kind, (time.perf_counter() - started) * 1000)
+        session.commit()
+
+    # Delete done jobs finished more than `days` (default JOB_RETENTION_DAYS) ago, in batches so
+    # no single statement holds locks for long. Returns how many were deleted.
+    def purge(self, days=None, batch_size=1000):
+        Job, session = self.model, self.db.session
+        days = self.app.config['JOB_RETENTION_DAYS'] if days is None else days
+        cutoff = datetime.now() - timedelta(days=days)
+        deleted = 0
+        while True:
+            ids = [job_id for (job_id,) in session.query(Job.id)
+                   .filter(Job.status == 'done', Job.finished_at < cutoff).limit(batch_size)]
+            if not ids:
+                return deleted
+            deleted += session.query(Job).filter(Job.id.in_(ids)).delete(synchronize_session=False)
+            session.commit()
+
+    # One worker thread per process purges every JOB_PURGE_INTERVAL seconds
+    def _purge_if_due(self):
+        if not self.app.config['JOB_RETENTION_DAYS']:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_purge:
+                return
+            self._next_purge = time.monotonic() + self.app.config['JOB_PURGE_INTERVAL']
+        try:
+            with self.app.app_context():
+                deleted = self.purge()
+            if deleted:
+                logger.info("deleted %d done jobs", deleted)
+        except Exception:
+            logger.exception("purging done jobs failed")
+
+    # Job counts per status, for the metrics endpoint
+    def stats(self):
+        Job = self.model
+        counts = dict(self.db.session.query(Job.status, self.db.func.count(Job.id)).group_by(Job.status).all())
+        return {'workers': len(self.threads), 'jobs': counts}
@@ -0,0 +1,28 @@
+"""question id counter
+
+Revision ID: 5e07b3c9d8a2
+Revises: a4d82f6c3e51
+Create Date: 2026-10-18 13:05:49.262730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e07b3c9d8a2'
+down_revision = 'a4d82f6c3e51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('question_id_counter',
+        sa.Column('day', sa.String(length=6), nullable=False),
+        sa.Column('last_serial', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade():
+    op.drop_table('question_id_counter')
@@ -0,0 +1,36 @@
+"""department stat counters
+
+Revision ID: 7c1e4a9b2d10
+Revises: 3896a0ebd7cd
+Create Date: 2026-10-18 10:02:11.114021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a9b2d10'
+down_revision = '3896a0ebd7cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('department_stat',
+        sa.Column('department_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('pending', sa.Integer(), nullable=False),
+        sa.Column('replied', sa.Integer(), nullable=False),
+        sa.Column('pending_0_7', sa.Integer(), nullable=False),
+        sa.Column('pending_7_15', sa.Integer(), nullable=False),
+        sa.Column('pending_15_30', sa.Integer(), nullable=False),
+        sa.Column('pending_30_plus', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['department_id'], ['department.id'], ),
+        sa.PrimaryKeyConstraint('department_id')
+    )
+
+
+def downgrade():
+    op.drop_table('department_stat')
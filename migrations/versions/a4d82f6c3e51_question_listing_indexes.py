@@ -0,0 +1,42 @@
+"""question listing indexes
+
+Revision ID: a4d82f6c3e51
+Revises: 7c1e4a9b2d10
+Create Date: 2026-10-18 11:40:37.508113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d82f6c3e51'
+down_revision = '7c1e4a9b2d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.create_index('ix_question_department_created', ['department_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_question_created', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('reply', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reply_question_id'), ['question_id'], unique=False)
+
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_file_question_id'), ['question_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_file_reply_id'), ['reply_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_reply_id'))
+        batch_op.drop_index(batch_op.f('ix_file_question_id'))
+
+    with op.batch_alter_table('reply', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reply_question_id'))
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_created')
+        batch_op.drop_index('ix_question_department_created')
@@ -0,0 +1,28 @@
+"""replica heartbeat
+
+Revision ID: a7d3f9c2b415
+Revises: f2c6b8d41e73
+Create Date: 2026-10-18 21:14:37.402115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f9c2b415'
+down_revision = 'f2c6b8d41e73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('replica_heartbeat',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('beat_ms', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeat')
@@ -0,0 +1,28 @@
+"""department stat version stamp
+
+Revision ID: b3e8d1f7a924
+Revises: a7d3f9c2b415
+Create Date: 2026-10-18 23:05:41.287310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d1f7a924'
+down_revision = 'a7d3f9c2b415'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('department_stat', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('changed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('department_stat', schema=None) as batch_op:
+        batch_op.drop_column('changed_at')
+        batch_op.drop_column('version')
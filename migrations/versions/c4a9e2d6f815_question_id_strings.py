@@ -0,0 +1,38 @@
+"""reply and file question_id as strings
+
+Revision ID: c4a9e2d6f815
+Revises: b3e8d1f7a924
+Create Date: 2026-10-19 10:12:08.540372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e2d6f815'
+down_revision = 'b3e8d1f7a924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Question IDs are MMDDYYXXXX strings; as integers the IDs of January to September lost
+    # their leading zero, so the converted values are padded back to ten digits
+    if op.get_bind().dialect.name == 'sqlite':
+        padded = "substr('0000000000' || question_id, -10, 10)"
+    else:
+        padded = "LPAD(question_id, 10, '0')"
+    for table, nullable in (('reply', False), ('file', True)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('question_id', existing_type=sa.Integer(), type_=sa.String(length=10),
+                                  existing_nullable=nullable)
+        op.execute(f"UPDATE {table} SET question_id = {padded} "
+                   f"WHERE question_id IS NOT NULL AND length(question_id) < 10")
+
+
+def downgrade():
+    for table, nullable in (('file', True), ('reply', False)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('question_id', existing_type=sa.String(length=10), type_=sa.Integer(),
+                                  existing_nullable=nullable)
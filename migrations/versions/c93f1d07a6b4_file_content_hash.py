@@ -0,0 +1,30 @@
+"""file content hash
+
+Revision ID: c93f1d07a6b4
+Revises: 5e07b3c9d8a2
+Create Date: 2026-10-18 14:21:03.871554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c93f1d07a6b4'
+down_revision = '5e07b3c9d8a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_file_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_content_hash'))
+        batch_op.drop_column('size')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,35 @@
+"""department daily rollup
+
+Revision ID: d5a7c3e90b12
+Revises: b8f4e2a19c06
+Create Date: 2026-10-18 19:10:27.604318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a7c3e90b12'
+down_revision = 'b8f4e2a19c06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('department_daily_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('department_id', sa.Integer(), nullable=False),
+        sa.Column('received', sa.Integer(), nullable=False),
+        sa.Column('replies', sa.Integer(), nullable=False),
+        sa.Column('first_replies', sa.Integer(), nullable=False),
+        sa.Column('first_reply_seconds', sa.BigInteger(), nullable=False),
+        sa.Column('sla_breached', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['department_id'], ['department.id'], ),
+        sa.PrimaryKeyConstraint('day', 'department_id')
+    )
+    # Existing history is loaded with: flask --app app rebuild-rollups
+
+
+def downgrade():
+    op.drop_table('department_daily_rollup')
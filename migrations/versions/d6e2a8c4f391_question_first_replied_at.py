@@ -0,0 +1,29 @@
+"""question first reply time
+
+Revision ID: d6e2a8c4f391
+Revises: c4a9e2d6f815
+Create Date: 2026-10-18 21:14:37.502318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6e2a8c4f391'
+down_revision = 'c4a9e2d6f815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('first_replied_at', sa.DateTime(), nullable=True))
+    # Questions replied to before the column existed
+    op.execute("UPDATE question SET first_replied_at = "
+               "(SELECT MIN(reply.created_at) FROM reply WHERE reply.question_id = question.id)")
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('first_replied_at')
@@ -0,0 +1,53 @@
+"""search document index
+
+Revision ID: e1b6a5f28c37
+Revises: c93f1d07a6b4
+Create Date: 2026-10-18 16:48:12.390215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b6a5f28c37'
+down_revision = 'c93f1d07a6b4'
+branch_labels = None
+depends_on = None
+
+# Devanagari vowel signs and other combining marks are part of words, not separators
+DEVANAGARI_MARKS = ''.join(chr(c) for c in [*range(0x900, 0x904), *range(0x93a, 0x950), *range(0x951, 0x958), 0x962, 0x963])
+
+
+def upgrade():
+    op.create_table('search_document',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('ref_id', sa.String(length=20), nullable=False),
+        sa.Column('question_id', sa.String(length=10), nullable=False),
+        sa.Column('department_id', sa.Integer(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['department_id'], ['department.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('search_document', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_document_department_id'), ['department_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_search_document_question_id'), ['question_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ix_search_document_body', 'search_document', ['body'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_document_fts USING fts5("
+            "body, content='search_document', content_rowid='id', "
+            f"tokenize=\"unicode61 tokenchars '{DEVANAGARI_MARKS}'\")"
+        )
+    # Existing rows are indexed with: flask --app app rebuild-search-index
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_document_fts")
+    op.drop_table('search_document')
@@ -0,0 +1,32 @@
+"""normalize SQLite timestamp text
+
+Revision ID: e8c4f1a7b350
+Revises: d6e2a8c4f391
+Create Date: 2026-10-18 22:03:18.640157
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c4f1a7b350'
+down_revision = 'd6e2a8c4f391'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [('question', 'created_at'), ('question', 'first_replied_at'), ('reply', 'created_at'), ('file', 'created_at')]
+
+
+# SQLite keeps DATETIME as text. CURRENT_TIMESTAMP defaults stored 'YYYY-MM-DD HH:MM:SS', while
+# values bound from Python carry microseconds, and the two don't compare as times (a row sorts
+# before its own paging cursor). MySQL stores real DATETIMEs and needs nothing.
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, column in COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,26 @@
+"""question version stamp
+
+Revision ID: f2c6b8d41e73
+Revises: d5a7c3e90b12
+Create Date: 2026-10-18 19:52:03.118540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6b8d41e73'
+down_revision = 'd5a7c3e90b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('version')
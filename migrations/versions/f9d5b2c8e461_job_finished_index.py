@@ -0,0 +1,26 @@
+"""job retention index
+
+Revision ID: f9d5b2c8e461
+Revises: e8c4f1a7b350
+Create Date: 2026-10-18 22:41:05.917264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9d5b2c8e461'
+down_revision = 'e8c4f1a7b350'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_status_finished_at', ['status', 'finished_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_status_finished_at')
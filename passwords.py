@@ -0,0 +1,74 @@
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+PREFIX = 'scrypt'
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+# scrypt password hashes stored as scrypt$<n>$<r>$<p>$<salt>$<hash>, so each hash records the
+# parameters it was made with and stays verifiable after they are raised.
+# hashlib.scrypt releases the GIL, and the work runs on a small dedicated pool: other requests
+# keep running during a login spike, and at most `workers` hashes (n * r * 128 bytes of memory
+# each) are computed at once. A caller that waits longer than `timeout` gets PasswordHasherBusy.
+class PasswordHasher:
+    def __init__(self, n=2 ** 14, r=8, p=1, workers=4, timeout=10):
+        self.n, self.r, self.p = n, r, p
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+        # Verified when the username is unknown, so the response takes as long as for a wrong password
+        self._dummy = self._hash_sync('', os.urandom(16), n, r, p)
+
+    @staticmethod
+    def _derive(password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p + 1024 * 1024, dklen=32)
+
+    def _hash_sync(self, password, salt, n, r, p):
+        key = self._derive(password, salt, n, r, p)
+        return f"{PREFIX}${n}${r}${p}${b64encode(salt)}${b64encode(key)}"
+
+    def _run(self, func, *args):
+        future = self.executor.submit(func, *args)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("password hashing is overloaded")
+
+    def hash(self, password):
+        return self._run(self._hash_sync, password, os.urandom(16), self.n, self.r, self.p)
+
+    # Check a password against a stored hash. `stored` may be None (unknown user) or a legacy
+    # plaintext value from before hashing, which is compared in constant time.
+    def verify(self, password, stored):
+        if stored is None:
+            self._run(self._verify_sync, password, self._dummy)
+            return False
+        if not stored.startswith(PREFIX + '$'):
+            return hmac.compare_digest(password.encode(), stored.encode())
+        return self._run(self._verify_sync, password, stored)
+
+    def _verify_sync(self, password, stored):
+        try:
+            _, n, r, p, salt, key = stored.split('$')
+            expected = self._derive(password, b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(expected, b64decode(key))
+
+    # True for plaintext values and hashes made with other parameters than the current ones
+    def needs_rehash(self, stored):
+        return stored.split('$')[:4] != [PREFIX, str(self.n), str(self.r), str(self.p)]
@@ -0,0 +1,137 @@
+import io
+import os
+import tempfile
+import threading
+
+# Pillow renders image thumbnails and PyMuPDF the first page of PDFs; both are optional and
+# attachments of a type whose library is missing simply get no preview
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # PyMuPDF before 1.24
+    except ImportError:
+        pymupdf = None
+
+IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp', 'image/tiff'}
+
+
+class PreviewError(Exception):
+    pass
+
+
+def can_preview(mimetype):
+    if mimetype in IMAGE_TYPES:
+        return Image is not None
+    if mimetype == 'application/pdf':
+        return pymupdf is not None
+    return False
+
+
+# Derived JPEG previews of attachments, stored under `root` keyed by the source blob's content
+# hash and the preview size, so each distinct upload is rendered once per size.
+# The cache is bounded by `max_bytes`: every hit refreshes the file's mtime and when the total
+# goes over the limit the least recently used previews are deleted.
+class PreviewCache:
+    def __init__(self, root, max_bytes, size=320, quality=70):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = size
+        self.quality = quality
+        self._total = None  # Bytes on disk, counted on first use
+        self._lock = threading.Lock()
+
+    def path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], f'{content_hash}-{self.size}.jpg')
+
+    # Path of the preview for a stored blob, rendering it on a miss
+    def get(self, content_hash, source_path, mimetype):
+        path = self.path(content_hash)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        if not can_preview(mimetype):
+            raise PreviewError(f"no preview for {mimetype}")
+        data = self.render(source_path, mimetype)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.preview-')
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(temp_path, path)
+        self._added(len(data), keep=path)
+        return path
+
+    def render(self, source_path, mimetype):
+        try:
+            if mimetype == 'application/pdf':
+                with pymupdf.open(source_path) as document:
+                    if not document.page_count:
+                        raise PreviewError("PDF has no pages")
+                    page = document[0]
+                    zoom = self.size / max(page.rect.width, page.rect.height)
+                    pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+                    return pixmap.tobytes('jpeg', jpg_quality=self.quality)
+
+            with Image.open(source_path) as image:
+                image.draft('RGB', (self.size, self.size))  # Lets JPEG decode at a reduced scale
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((self.size, self.size))
+                out = io.BytesIO()
+                image.convert('RGB').save(out, 'JPEG', quality=self.quality, optimize=True)
+                return out.getvalue()
+        except PreviewError:
+            raise
+        except Exception as error:
+            raise PreviewError(f"could not render preview: {error}") from error
+
+    def _added(self, size, keep):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict(keep)
+
+    def _entries(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    # Delete least recently used previews until the cache is back under 90% of its limit,
+    # sparing the one just rendered
+    def _evict(self, keep):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
+
+    def stats(self):
+        with self._lock:
+            return {'bytes': self._total, 'max_bytes': self.max_bytes}
@@ -0,0 +1,192 @@
+import cProfile
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# One profiled request. Time is split into exclusive phases: SQL statements are counted under
+# `db` only, so a lazy load while a template renders doesn't count twice; whatever is left over
+# is `other` (view code, form parsing, password hashing, ...).
+class Profile:
+    def __init__(self, reason):
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.phases = {'db': 0.0, 'template': 0.0, 'io': 0.0}
+        self.statements = []
+        self.templates = {}  # name: [renders, seconds]
+        self._open = []
+        self.profiler = None
+
+    def enter(self, name):
+        self._open.append((name, time.perf_counter(), self.phases['db']))
+
+    def leave(self, label=None):
+        name, started, db_before = self._open.pop()
+        elapsed = time.perf_counter() - started
+        exclusive = elapsed - (self.phases['db'] - db_before)
+        if not self._open:  # Nested phases are already inside the outer one
+            self.phases[name] += exclusive
+        if name == 'template':
+            totals = self.templates.setdefault(label, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+# Opt-in request profiling: an admin adds the PROFILE_HEADER header or the PROFILE_QUERY_FLAG
+# query argument to a request, or PROFILE_SAMPLE_RATE profiles that share of all requests. Each
+# profile splits the request into DB, template and I/O time, keeps the slowest statements and,
+# when no other request is being profiled, a cProfile summary of the hottest functions. The last
+# PROFILE_HISTORY profiles are kept in memory. Requests that aren't profiled only pay for a
+# header lookup and a check of `g` per statement.
+class RequestProfiler:
+    def __init__(self, app=None, is_admin=None):
+        self._ids = itertools.count(1)
+        self._cprofile_lock = threading.Lock()  # cProfile can only profile one thread at a time
+        self.is_admin = is_admin
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILE_HISTORY', 50)
+        app.config.setdefault('PROFILE_HEADER', 'X-Profile')
+        app.config.setdefault('PROFILE_QUERY_FLAG', '_profile')
+        app.config.setdefault('PROFILE_TOP_FUNCTIONS', 30)
+        self.app = app
+        self.profiles = deque(maxlen=app.config['PROFILE_HISTORY'])
+        self._lock = threading.Lock()
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    # Times the block as a phase (e.g. 'io') of the current profile; does nothing otherwise
+    @contextmanager
+    def phase(self, name):
+        profile = g.get('profile') if has_request_context() else None
+        if profile is None:
+            yield
+            return
+        profile.enter(name)
+        try:
+            yield
+        finally:
+            profile.leave()
+
+    def _requested(self):
+        config = self.app.config
+        if request.headers.get(config['PROFILE_HEADER']) or config['PROFILE_QUERY_FLAG'] in request.args:
+            # Only honoured for admins; the check runs only when the flag is present
+            if self.is_admin is not None and self.is_admin():
+                return 'requested'
+        rate = config['PROFILE_SAMPLE_RATE']
+        if rate and random.random() < rate:
+            return 'sampled'
+        return None
+
+    def _start_request(self):
+        reason = self._requested()
+        if reason is None:
+            return
+        profile = g.profile = Profile(reason)
+        if self._cprofile_lock.acquire(blocking=False):
+            profile.profiler = cProfile.Profile()
+            try:
+                profile.profiler.enable()
+            except ValueError:  # Another profiler (a debugger, coverage) is active
+                profile.profiler = None
+                self._cprofile_lock.release()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get('profile') is not None:
+            conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get('profile') is not None and conn.info.get('profile_started'):
+            elapsed = time.perf_counter() - conn.info['profile_started'].pop()
+            g.profile.phases['db'] += elapsed
+            g.profile.statements.append((statement, elapsed))
+
+    def _before_render(self, sender, template, context, **extra):
+        if g.get('profile') is not None:
+            g.profile.enter('template')
+
+    def _after_render(self, sender, template, context, **extra):
+        if g.get('profile') is not None:
+            g.profile.leave(template.name)
+
+    def _stop_cprofile(self, profile):
+        if profile.profiler is None:
+            return None
+        profile.profiler.disable()
+        self._cprofile_lock.release()
+        stats = pstats.Stats(profile.profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)  # By own time
+        profile.profiler = None
+        return [{
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        } for func, (_, calls, own, cumulative, _) in rows[:self.app.config['PROFILE_TOP_FUNCTIONS']]]
+
+    def _record(self, profile, status):
+        total = time.perf_counter() - profile.started
+        functions = self._stop_cprofile(profile)
+        phases = {name: round(seconds * 1000, 3) for name, seconds in profile.phases.items()}
+        phases['other'] = round(max(total * 1000 - sum(phases.values()), 0), 3)
+        slowest = sorted(profile.statements, key=lambda item: item[1], reverse=True)[:10]
+        record = {
+            'id': next(self._ids),
+            'at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+            'reason': profile.reason,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': status,
+            'total_ms': round(total * 1000, 3),
+            'phases': phases,
+            'queries': len(profile.statements),
+            'slowest_statements': [{'statement': statement[:1000], 'ms': round(elapsed * 1000, 3)}
+                                   for statement, elapsed in slowest],
+            'templates': [{'name': name, 'renders': renders, 'ms': round(elapsed * 1000, 3)}
+                          for name, (renders, elapsed) in profile.templates.items()],
+            'functions': functions,
+        }
+        with self._lock:
+            self.profiles.append(record)
+        return record
+
+    def _finish_request(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        record = self._record(profile, response.status_code)
+        response.headers['X-Profile-Id'] = str(record['id'])
+        return response
+
+    # A request that raised skips after_request; still stop cProfile and keep what was measured
+    def _teardown_request(self, exception):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            self._record(profile, 500)
+
+    def recent(self):
+        with self._lock:
+            return list(reversed(self.profiles))
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((record for record in self.profiles if record['id'] == profile_id), None)
@@ -0,0 +1,161 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('jansunwai.replicas')
+
+
+# Session that sends the reads of a replica-routed request to the replica picked for it.
+# Flushes and INSERT/UPDATE/DELETE statements always go to the primary, as does everything
+# outside such a request.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        replica = g.get('replica_bind') if has_app_context() else None
+        if replica is None or bind is not None or self._flushing or getattr(clause, 'is_dml', False):
+            return engine
+        if engine is not self._db.engine:  # Another bind, e.g. the archive
+            return engine
+        return self._db.engines[replica]
+
+
+# Read/write splitting. Views decorated with @read_only read from one of the REPLICA_BINDS for
+# GET requests, unless:
+#  - the user's browser wrote something within REPLICA_CONSISTENCY_SECONDS (a cookie records
+#    the last write), so an officer always sees their own reply right away, or
+#  - every replica lags more than REPLICA_MAX_LAG_SECONDS or can't be reached.
+# Lag is measured with a heartbeat row: every REPLICA_LAG_CHECK_SECONDS each process reads the
+# row on the replicas, compares it with the primary and writes a new beat there.
+# A replica that hasn't applied the previous beat is taken to be as far behind as the beat it
+# has, so keep REPLICA_MAX_LAG_SECONDS at or above the check interval.
+class ReplicaRouter:
+    def __init__(self, app=None, db=None, heartbeat=None):
+        self._lock = threading.Lock()
+        self._checking = threading.Lock()
+        self._state = {}
+        self._checked = 0.0
+        if app is not None:
+            self.init_app(app, db, heartbeat)
+
+    def init_app(self, app, db, heartbeat):
+        app.config.setdefault('REPLICA_BINDS', [])
+        app.config.setdefault('REPLICA_MAX_LAG_SECONDS', 5.0)
+        app.config.setdefault('REPLICA_CONSISTENCY_SECONDS', 10.0)
+        app.config.setdefault('REPLICA_LAG_CHECK_SECONDS', 5.0)
+        self.app = app
+        self.db = db
+        self.heartbeat = heartbeat.__table__
+        self._state = {key: {'lag': None, 'reads': 0, 'error': None}
+                       for key in app.config['REPLICA_BINDS']}
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    # Mark a view whose GET requests may read from a replica
+    def read_only(self, view):
+        view.read_replica = True
+        return view
+
+    # Read from the primary inside the block, e.g. before writing something derived from the reads
+    @contextmanager
+    def primary(self):
+        replica = g.pop('replica_bind', None) if has_app_context() else None
+        try:
+            yield
+        finally:
+            if replica is not None:
+                g.replica_bind = replica
+
+    def _start_request(self):
+        if not self._state or request.method not in ('GET', 'HEAD'):
+            return
+        view = self.app.view_functions.get(request.endpoint)
+        if not getattr(view, 'read_replica', False):
+            return
+        last_write = session.get('last_write')
+        if last_write and time.time() - last_write < self.app.config['REPLICA_CONSISTENCY_SECONDS']:
+            return
+        replicas = [key for key in self._state if self._healthy(key)]
+        if replicas:
+            g.replica_bind = random.choice(replicas)
+            with self._lock:
+                self._state[g.replica_bind]['reads'] += 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and (context.isinsert or context.isupdate or context.isdelete) \
+                and not context.execution_options.get('heartbeat') and has_request_context():
+            g.db_write = True
+
+    def _finish_request(self, response):
+        if g.pop('db_write', False):
+            session['last_write'] = time.time()
+        return response
+
+    def _healthy(self, key):
+        if time.monotonic() - self._checked >= self.app.config['REPLICA_LAG_CHECK_SECONDS'] \
+                and self._checking.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._checking.release()
+        lag = self._state[key]['lag']
+        return lag is not None and lag <= self.app.config['REPLICA_MAX_LAG_SECONDS']
+
+    def _read_beat(self, connection):
+        heartbeat = self.heartbeat
+        return connection.execute(
+            heartbeat.select().with_only_columns(heartbeat.c.beat_ms).where(heartbeat.c.id == 1)
+        ).scalar()
+
+    # Measure the lag of every replica in seconds (None if it can't be reached), then write the
+    # next beat on the primary
+    def check(self):
+        now = time.time()
+        beats = {}
+        for key in self._state:
+            try:
+                with self.db.engines[key].connect() as connection:
+                    beats[key] = self._read_beat(connection)
+            except Exception as error:
+                logger.warning("replica %s unavailable: %s", key, error)
+                beats[key] = error
+        try:
+            with self.db.engine.begin() as connection:
+                connection = connection.execution_options(heartbeat=True)  # Not a user's write
+                primary_beat = self._read_beat(connection)
+                values = {'beat_ms': int(now * 1000)}
+                if primary_beat is None:
+                    connection.execute(self.heartbeat.insert().values(id=1, **values))
+                else:
+                    connection.execute(self.heartbeat.update().where(self.heartbeat.c.id == 1).values(**values))
+        except Exception as error:
+            logger.warning("can't write the replica heartbeat: %s", error)
+            primary_beat = None
+
+        with self._lock:
+            for key, beat in beats.items():
+                if isinstance(beat, Exception) or beat is None:
+                    lag = None  # Unreachable, or no beat replicated yet
+                elif primary_beat is not None and beat < primary_beat:
+                    lag = now - beat / 1000
+                else:
+                    lag = 0.0
+                if lag is None or lag > self.app.config['REPLICA_MAX_LAG_SECONDS']:
+                    logger.warning("replica %s is behind (%s s), reading from the primary", key,
+                                   'unknown' if lag is None else round(lag, 1))
+                self._state[key].update(lag=lag, error=str(beat) if isinstance(beat, Exception) else None)
+            self._checked = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {key: {'lag_seconds': None if state['lag'] is None else round(state['lag'], 3),
+                          'healthy': state['lag'] is not None and state['lag'] <= self.app.config['REPLICA_MAX_LAG_SECONDS'],
+                          'reads': state['reads'], 'error': state['error']}
+                    for key, state in self._state.items()}
@@ -0,0 +1,87 @@
+import csv
+import io
+import os
+import zipfile
+
+# openpyxl is optional; without it only CSV files can be read
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# What a malformed CSV or a corrupt or mislabelled workbook raises while it is read
+READ_ERRORS = (csv.Error, zipfile.BadZipFile, KeyError, ValueError, SyntaxError)
+if openpyxl is not None:
+    from openpyxl.utils.exceptions import InvalidFileException
+    READ_ERRORS += (InvalidFileException,)
+
+
+class SpreadsheetError(Exception):
+    pass
+
+
+# Yield the data rows of a CSV or XLSX upload as dicts keyed by the lower-cased header row.
+# Rows are read one at a time, so large sheets are never loaded whole. A file that isn't UTF-8
+# CSV or a readable workbook, or lacks one of the `required` columns, raises SpreadsheetError.
+# The stream is left open, so a caller can seek back and read it again.
+def read_rows(stream, filename, required=()):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ('.csv', '.xlsx'):
+        raise SpreadsheetError(f"unsupported file type '{extension}', expected .csv or .xlsx")
+    if extension == '.xlsx' and openpyxl is None:
+        raise SpreadsheetError("XLSX import needs the openpyxl package; upload a CSV file instead")
+
+    text = workbook = None
+    try:
+        if extension == '.csv':
+            text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+            reader = csv.reader(text)
+        else:
+            workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+            reader = workbook.active.iter_rows(values_only=True)
+
+        header = next(reader, None)
+        keys = [str(value or '').strip().lower() for value in header or ()]
+        missing = [column for column in required if column not in keys]
+        if missing:
+            raise SpreadsheetError(f"missing column(s) in the header row: {', '.join(missing)}")
+        for values in reader:
+            if not any(values):
+                continue  # Skip blank lines
+            yield {key: '' if value is None else str(value).strip() for key, value in zip(keys, values)}
+    except UnicodeDecodeError:
+        raise SpreadsheetError(f"{os.path.basename(filename)} is not UTF-8 text; save it as 'CSV UTF-8' and upload it again")
+    except READ_ERRORS as error:
+        raise SpreadsheetError(f"can't read {os.path.basename(filename)}: {error}")
+    finally:
+        if text is not None:
+            text.detach()  # Closing the wrapper would close the stream
+        if workbook is not None:
+            workbook.close()
+
+
+# Encode rows as CSV text one line at a time, for streaming responses
+def csv_lines(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield '\ufeff' + buffer.getvalue()  # BOM so Excel opens UTF-8 (Hindi) text correctly
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+# Write rows to an XLSX file with openpyxl's write-only mode, which keeps memory flat.
+# The zip container can only be produced once all rows are written, so XLSX downloads
+# start when the file is complete, unlike CSV.
+def write_xlsx(path, header, rows):
+    if openpyxl is None:
+        raise SpreadsheetError("XLSX export needs the openpyxl package; use CSV instead")
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+# Uploads are copied in chunks of this size so a worker never holds a whole file in memory
+CHUNK_SIZE = 64 * 1024
+
+# A stored upload: sha256 of the content, size in bytes and path relative to the upload folder
+StoredBlob = namedtuple('StoredBlob', ['content_hash', 'size', 'path'])
+
+
+# Content-addressed location of a blob, fanned out over two directory levels
+def blob_path(content_hash):
+    return '/'.join(['blobs', content_hash[:2], content_hash[2:4], content_hash])
+
+
+# Stream an upload into the blob store, hashing it while it is written.
+# Identical content is kept once: if the blob already exists the new copy is discarded.
+def save_blob(stream, root, chunk_size=CHUNK_SIZE):
+    blob_dir = os.path.join(root, 'blobs')
+    os.makedirs(blob_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=blob_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                digest.update(chunk)
+                out.write(chunk)
+
+        content_hash = digest.hexdigest()
+        path = blob_path(content_hash)
+        target = os.path.join(root, path)
+        if os.path.exists(target):
+            os.remove(temp_path)
+            os.utime(target)  # Marks it as in use again for the archiver's cleanup of loose blobs
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return StoredBlob(content_hash, size, path)
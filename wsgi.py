@@ -0,0 +1,25 @@
+# Production WSGI entry point for pre-fork servers, e.g.
+#   gunicorn --workers 4 --threads 4 'wsgi:create_app()'
+#   uwsgi --http :8000 --module wsgi:application --processes 4 --threads 4
+# Don't preload the app in the master process (gunicorn --preload): every worker must open its
+# own database connections and start its own job worker threads after the fork.
+import os
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+_app = None
+
+
+# Returns the configured Flask app. Behind a reverse proxy set PROXY_FIX=1 so client addresses
+# and the scheme are taken from the proxy's X-Forwarded-* headers.
+def create_app():
+    global _app
+    if _app is None:
+        from app import app
+        if os.environ.get('PROXY_FIX') == '1':
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
+        _app = app
+    return _app
+
+
+application = create_app()